@@ -1,62 +1,229 @@
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
 import uvicorn
-import sqlite3
+import asyncio
+import functools
+import hashlib
 import os
-import requests
+import re
+import shlex
+import shutil
+import threading
+import aiosqlite
+from aiosqlitepool import SQLiteConnectionPool
+import aiofiles
+import httpx
+import orjson
 import subprocess
-import markdown
-import duckdb
-import speech_recognition as sr
-from PIL import Image
-from git import Repo
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
 app = FastAPI()
 
+# Heavy modules are imported on first use so startup only pays for what is called
+@functools.cache
+def _markdown():
+    import markdown
+    return markdown
+
+@functools.cache
+def _duckdb():
+    import duckdb
+    return duckdb
+
+@functools.cache
+def _sr():
+    import speech_recognition
+    return speech_recognition
+
+@functools.cache
+def _pil_image():
+    from PIL import Image
+    return Image
+
+@functools.cache
+def _git():
+    import git
+    return git
+
 # Set the base data directory to an absolute path
 DATA_DIR = "/data"
+ALLOWED_BASE = os.path.abspath(DATA_DIR)
 db_path = os.path.join(DATA_DIR, "task_history.db")
 AIPROXY_URL = "https://aiproxy.sanand.workers.dev/openai/v1/chat/completions"
+AIPROXY_MODEL = "gpt-4o-mini"
 AIPROXY_TOKEN = os.getenv("AIPROXY_TOKEN")
 if not AIPROXY_TOKEN:
     raise ValueError("AIPROXY_TOKEN is not set in environment variables")
 
+# Shared async HTTP client so repeat calls reuse pooled keep-alive connections
+_http = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+    timeout=60,
+    # requests followed redirects by default; httpx does not
+    follow_redirects=True,
+)
+AIPROXY_HEADERS = {"Authorization": f"Bearer {AIPROXY_TOKEN}", "Content-Type": "application/json"}
+
+def get_session() -> httpx.AsyncClient:
+    return _http
+
+# Long-lived SQLite connections keep the page cache hot across requests
+pool = None
+
+# Task history rows are queued and committed in batches by a background writer
+TASK_BATCH_SIZE = 50
+TASK_BATCH_INTERVAL = 0.1
+_insert_q: asyncio.Queue = None
+_writer_task: asyncio.Task = None
+
+# Per-connection settings; they persist for the life of each pooled connection
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+# Kept as one constant so each pooled connection reuses its cached prepared statement
+INSERT_TASK_SQL = "INSERT INTO tasks (task, status, output) VALUES (?, ?, ?)"
+
+async def sqlite_connection_factory():
+    conn = await aiosqlite.connect(db_path)
+    for pragma in SQLITE_PRAGMAS:
+        await conn.execute(pragma)
+    return conn
+
 # Ensure the DATA_DIR exists and initialize SQLite Database
-def init_db():
+@app.on_event("startup")
+async def init_db():
+    global pool, _insert_q, _writer_task, _batch_sem, _transcribe_sem
     os.makedirs(DATA_DIR, exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute(
-        '''CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY, 
-            task TEXT, 
-            status TEXT, 
-            output TEXT
-        )'''
-    )
-    conn.commit()
-    conn.close()
+    pool = SQLiteConnectionPool(sqlite_connection_factory)
+    async with pool.connection() as conn:
+        await conn.execute(
+            '''CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY, 
+                task TEXT, 
+                status TEXT, 
+                output TEXT
+            )'''
+        )
+        await conn.execute(
+            '''CREATE TABLE IF NOT EXISTS transcripts (
+                hash TEXT PRIMARY KEY,
+                text TEXT
+            )'''
+        )
+        await conn.commit()
 
-init_db()
+    _insert_q = asyncio.Queue()
+    _batch_sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+    _transcribe_sem = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+    _writer_task = asyncio.create_task(task_writer())
+
+async def task_writer():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _insert_q.get()]
+        deadline = loop.time() + TASK_BATCH_INTERVAL
+        while len(batch) < TASK_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_insert_q.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            async with pool.connection() as conn:
+                await conn.executemany(INSERT_TASK_SQL, batch)
+                await conn.commit()
+        except Exception as e:
+            print("Failed to write task history:", e)
+        finally:
+            for _ in batch:
+                _insert_q.task_done()
+
+@app.on_event("shutdown")
+async def close_db():
+    # Flush queued task history before tearing down the pool
+    if _writer_task is not None:
+        await _insert_q.join()
+        _writer_task.cancel()
+    if pool is not None:
+        await pool.close()
+    await _http.aclose()
+    close_duckdb()
 
 # Secure path validation to ensure access remains within DATA_DIR
 def is_valid_path(path: str) -> bool:
     abs_path = os.path.abspath(path)
-    allowed_base = os.path.abspath(DATA_DIR)
-    return abs_path.startswith(allowed_base)
+    # commonpath also rejects sibling prefixes such as /data-other
+    return os.path.commonpath([abs_path, ALLOWED_BASE]) == ALLOWED_BASE
+
+# Best-effort denylists; this is not a sandbox, and any allowed program with its own
+# delete option can still remove files.
+# Deleters are rejected wherever they appear in the command
+DELETE_COMMANDS = frozenset({"rm", "rmdir", "unlink", "mv", "dd", "shred", "truncate"})
+# Arguments that make find delete files or run other programs
+BANNED_ARGS = frozenset({"-delete", "-exec", "-execdir", "-ok", "-okdir"})
+# Shells and interpreters are only rejected as the program being run
+BANNED_PROGRAMS = frozenset({"sh", "bash", "dash", "zsh", "env", "xargs", "python", "python3", "perl"})
+# Versioned interpreters such as python3.11 are rejected by program-name prefix
+BANNED_PROGRAM_PREFIXES = ("python", "perl")
+# Executables must resolve to one of these directories; /usr/local/bin is left out
+# because the python image installs its interpreter and pip scripts there
+ALLOWED_BIN_DIRS = frozenset({"/bin", "/usr/bin"})
+COMMAND_TIMEOUT = 30
+
+# Commands run without a shell, so shell syntax would be passed through as literal arguments
+def split_command(command: str) -> list:
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid command: {e}")
+    for token in tokens:
+        if token and all(ch in lexer.punctuation_chars for ch in token):
+            raise HTTPException(status_code=400, detail=f"Shell operator not supported: {token}")
+        if "*" in token:
+            raise HTTPException(status_code=400, detail=f"Glob patterns are not supported: {token}")
+    return tokens
 
 # Function to execute shell commands safely
 def run_command(command: str):
-    tokens = command.split()
+    tokens = split_command(command)
+    if not tokens:
+        raise HTTPException(status_code=400, detail="Empty command")
+
     # Disallow commands that delete files
-    if "rm" in tokens or "unlink" in tokens:
+    if any(os.path.basename(token) in DELETE_COMMANDS or token in BANNED_ARGS for token in tokens):
         raise HTTPException(status_code=400, detail="File deletion is not allowed")
+
+    program = os.path.basename(tokens[0])
+    if program in BANNED_PROGRAMS or program.startswith(BANNED_PROGRAM_PREFIXES):
+        raise HTTPException(status_code=400, detail=f"Shells and interpreters are not allowed: {tokens[0]}")
+
+    executable = shutil.which(tokens[0])
+    if executable is None or os.path.dirname(executable) not in ALLOWED_BIN_DIRS:
+        raise HTTPException(status_code=400, detail=f"Command not allowed: {tokens[0]}")
     
-    # Only allow commands that reference files in DATA_DIR
-    if not any(token.startswith(DATA_DIR) for token in tokens):
-        raise HTTPException(status_code=400, detail="Access outside DATA_DIR is not allowed")
+    # Commands run from DATA_DIR, so relative operands stay inside it unless they climb
+    # out with "..". Absolute operands, including --opt=/path values, must be inside it.
+    for token in tokens[1:]:
+        for operand in (token, token.partition("=")[2]):
+            if ".." in operand.split("/") or (operand.startswith("/") and not is_valid_path(operand)):
+                raise HTTPException(status_code=400, detail="Access outside DATA_DIR is not allowed")
     
     try:
-        result = subprocess.run(command, shell=True, text=True, capture_output=True)
+        result = subprocess.run(
+            tokens, shell=False, text=True, capture_output=True, timeout=COMMAND_TIMEOUT, cwd=DATA_DIR
+        )
         if result.returncode == 0:
             return result.stdout.strip()
         else:
@@ -64,119 +231,363 @@ def run_command(command: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Matches a fenced code block and captures its body
+FENCE_RE = re.compile(r"^```[^\n]*\n(.*?)\n```$", re.S)
+
+# Rough token budget for a task, estimated at ~4 characters per token
+MAX_TASK_TOKENS = 1000
+
+# LRU cache of generated commands keyed by (model, task)
+PLAN_CACHE_SIZE = 512
+_plan_cache: OrderedDict = OrderedDict()
+
+# Ask the AI Proxy for the shell command that performs a task
+async def plan_command(task: str, use_cache: bool = True) -> str:
+    key = (AIPROXY_MODEL, task)
+    if use_cache and key in _plan_cache:
+        _plan_cache.move_to_end(key)
+        return _plan_cache[key]
+
+    data = {
+        "model": AIPROXY_MODEL,
+        "messages": [
+            {"role": "system", "content": (
+                "You are an automation assistant. Generate only a single program invocation with its arguments. "
+                "It runs without a shell: do not use pipes, redirects, globs, variables or command chaining."
+            )},
+            {"role": "user", "content": task}
+        ]
+    }
+    response = await get_session().post(AIPROXY_URL, json=data, headers=AIPROXY_HEADERS)
+    response_json = orjson.loads(response.content)
+    print("AI Proxy response:", response_json)
+    if "choices" not in response_json:
+        raise HTTPException(status_code=response.status_code, detail=f"Invalid AI Proxy response: {response_json}")
+    
+    command = response_json["choices"][0]["message"]["content"].strip()
+
+    # Remove markdown code fences if present.
+    match = FENCE_RE.match(command)
+    if match:
+        command = match.group(1).strip()
+
+    _plan_cache[key] = command
+    _plan_cache.move_to_end(key)
+    if len(_plan_cache) > PLAN_CACHE_SIZE:
+        _plan_cache.popitem(last=False)
+    return command
+
 @app.post("/run")
-def run_task(task: str = Query(..., description="Task description in plain English")):
+async def run_task(
+    task: str = Query(..., description="Task description in plain English"),
+    nocache: bool = Query(False, description="Bypass the cached command for this task"),
+):
     try:
-        headers = {"Authorization": f"Bearer {AIPROXY_TOKEN}", "Content-Type": "application/json"}
-        data = {
-            "model": "gpt-4o-mini",
-            "messages": [
-                {"role": "system", "content": "You are an automation assistant. Generate only a single valid shell command."},
-                {"role": "user", "content": task}
-            ]
-        }
-        response = requests.post(AIPROXY_URL, json=data, headers=headers)
-        response_json = response.json()
-        print("AI Proxy response:", response_json)
-        if "choices" not in response_json:
-            raise HTTPException(status_code=response.status_code, detail=f"Invalid AI Proxy response: {response_json}")
-        
-        command = response_json["choices"][0]["message"]["content"].strip()
+        # Reject bad tasks before paying for an AI Proxy round-trip
+        if not task.strip():
+            raise HTTPException(status_code=400, detail="Task must not be empty")
+        if len(task) // 4 > MAX_TASK_TOKENS:
+            raise HTTPException(status_code=400, detail="Task is too long")
 
-        # Remove markdown code fences if present.
-        if command.startswith("```") and command.endswith("```"):
-            lines = command.splitlines()
-            command = "\n".join(lines[1:-1]).strip()
+        command = await plan_command(task, use_cache=not nocache)
         
         # Execute the shell command securely
-        output = run_command(command)
+        output = await asyncio.to_thread(run_command, command)
         
         # Store task result in SQLite
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        c.execute("INSERT INTO tasks (task, status, output) VALUES (?, ?, ?)", (task, "success", output))
-        conn.commit()
-        conn.close()
+        await _insert_q.put((task, "success", output))
         
         return {"status": "success", "output": output}
     except HTTPException as e:
         return {"status": "error", "message": str(e.detail)}
 
 @app.get("/read")
-def read_file(path: str = Query(..., description="File path to read")):
+async def read_file(path: str = Query(..., description="File path to read")):
     if not is_valid_path(path):
         raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
-    
-    try:
-        if not os.path.exists(path):
-            raise HTTPException(status_code=404, detail="File not found")
-        with open(path, "r") as file:
-            content = file.read()
-        return {"status": "success", "content": content}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    # Served with sendfile where available instead of buffering into a JSON body
+    return FileResponse(path, media_type="text/plain")
 
 # Business Task Endpoints
 
+FETCH_CHUNK_SIZE = 64 * 1024
+
 @app.post("/fetch_api")
-def fetch_api(url: str, output_path: str):
+async def fetch_api(url: str, output_path: str):
     if not is_valid_path(output_path):
         raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
-    response = requests.get(url)
-    with open(output_path, "w") as f:
-        f.write(response.text)
+    parsed_url = urlparse(url)
+    if parsed_url.scheme not in ("http", "https") or not parsed_url.netloc:
+        raise HTTPException(status_code=400, detail="Only http(s) URLs are allowed")
+    # Stream the body straight to disk instead of buffering and decoding it
+    async with get_session().stream("GET", url, timeout=30) as response:
+        if not response.is_success:
+            raise HTTPException(status_code=502, detail=f"Upstream returned {response.status_code}")
+        async with aiofiles.open(output_path, "wb") as f:
+            async for chunk in response.aiter_bytes(FETCH_CHUNK_SIZE):
+                await f.write(chunk)
     return {"status": "success", "message": "Data fetched"}
 
+# Opened repositories, keyed by path, so .git metadata is read once. Each entry
+# carries its own lock because a GitPython Repo is not safe to share across threads.
+_repos: dict = {}
+_repos_lock = threading.Lock()
+
+def get_repo(repo_path: str, repo_url: str):
+    with _repos_lock:
+        entry = _repos.get(repo_path)
+        if entry is None:
+            if os.path.exists(repo_path):
+                repo = _git().Repo(repo_path)
+            else:
+                repo = _git().Repo.clone_from(repo_url, repo_path)
+            entry = _repos[repo_path] = (repo, threading.Lock())
+        return entry
+
 @app.post("/git_commit")
 def git_commit(repo_url: str, commit_message: str):
     repo_path = os.path.join(DATA_DIR, "repo")
-    if os.path.exists(repo_path):
-        repo = Repo(repo_path)
-    else:
-        repo = Repo.clone_from(repo_url, repo_path)
-    repo.git.add(all=True)
-    repo.index.commit(commit_message)
-    repo.remote().push()
+    repo, lock = get_repo(repo_path, repo_url)
+    with lock:
+        repo.git.add(all=True)
+        repo.index.commit(commit_message)
+        repo.remote().push()
     return {"status": "success", "message": "Commit pushed"}
 
+# Persistent read-only DuckDB connections, one per database file. A connection is
+# reopened when the file's inode or mtime changes, so replaced files are picked up.
+# A stale connection is only closed once no request is using it; until then requests
+# keep sharing it, since DuckDB would hand a new connect() the same open instance anyway.
+# Note: an open read-only connection holds DuckDB's shared file lock, so other
+# processes cannot open that database for writing until the server shuts down.
+_duck_pool: dict = {}
+_duck_lock = threading.Lock()
+
+@contextmanager
+def duckdb_connection(path: str):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_ino, stat.st_mtime_ns)
+    with _duck_lock:
+        entry = _duck_pool.get(path)
+        if entry is not None and entry["version"] != version and entry["users"] == 0:
+            entry["conn"].close()
+            entry = None
+        if entry is None:
+            conn = _duckdb().connect(path, read_only=True)
+            conn.execute("PRAGMA threads=4")
+            conn.execute("PRAGMA memory_limit='1GB'")
+            entry = _duck_pool[path] = {"conn": conn, "version": version, "users": 0}
+        entry["users"] += 1
+    try:
+        yield entry["conn"]
+    finally:
+        with _duck_lock:
+            entry["users"] -= 1
+
+def close_duckdb():
+    with _duck_lock:
+        for entry in _duck_pool.values():
+            entry["conn"].close()
+        _duck_pool.clear()
+
 @app.post("/run_sql")
 def run_sql(db_path: str, query: str):
     if not is_valid_path(db_path):
         raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
-    conn = duckdb.connect(db_path)
-    result = conn.execute(query).fetchall()
-    conn.close()
+    if not os.path.isfile(db_path):
+        raise HTTPException(status_code=404, detail="Database not found")
+    # A per-request cursor isolates state while sharing the connection's caches
+    with duckdb_connection(db_path) as conn:
+        cursor = conn.cursor()
+        try:
+            result = cursor.execute(query).fetchall()
+        finally:
+            cursor.close()
     return {"status": "success", "result": result}
 
+# Batch endpoints run items concurrently, bounded so large batches don't thrash
+BATCH_CONCURRENCY = os.cpu_count() or 1
+MAX_BATCH_ITEMS = 100
+_batch_sem: asyncio.Semaphore = None
+
+def check_batch_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch must not be empty")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {MAX_BATCH_ITEMS} items")
+
+# Every item runs to completion, so nothing keeps writing after the response is sent
+async def run_batch(paths: list, coros: list):
+    outcomes = await asyncio.gather(*(_bounded(coro) for coro in coros), return_exceptions=True)
+    results = [
+        {"path": path, "status": "error", "message": str(outcome)} if isinstance(outcome, Exception)
+        else {"path": path, "status": "success"}
+        for path, outcome in zip(paths, outcomes)
+    ]
+    status = "success" if all(result["status"] == "success" for result in results) else "error"
+    return {"status": status, "results": results}
+
+async def _bounded(coro):
+    async with _batch_sem:
+        return await coro
+
+class ConvertItem(BaseModel):
+    md_path: str
+    output_path: str
+
+class ResizeItem(BaseModel):
+    image_path: str
+    width: int
+    height: int
+
+async def _convert_md(md_path: str, output_path: str):
+    async with aiofiles.open(md_path, "r") as f:
+        md_content = await f.read()
+    html_content = await asyncio.to_thread(_markdown().markdown, md_content)
+    async with aiofiles.open(output_path, "w") as f:
+        await f.write(html_content)
+
 @app.post("/convert_md")
-def convert_md_to_html(md_path: str, output_path: str):
+async def convert_md_to_html(md_path: str, output_path: str):
     if not is_valid_path(md_path) or not is_valid_path(output_path):
         raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
-    with open(md_path, "r") as f:
-        html_content = markdown.markdown(f.read())
-    with open(output_path, "w") as f:
-        f.write(html_content)
+    if not os.path.isfile(md_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    await _convert_md(md_path, output_path)
     return {"status": "success", "message": "Markdown converted to HTML"}
 
+@app.post("/convert_md_batch")
+async def convert_md_batch(items: list[ConvertItem]):
+    check_batch_size(items)
+    for item in items:
+        if not is_valid_path(item.md_path) or not is_valid_path(item.output_path):
+            raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
+        if not os.path.isfile(item.md_path):
+            raise HTTPException(status_code=404, detail=f"File not found: {item.md_path}")
+    return await run_batch(
+        [item.md_path for item in items],
+        [_convert_md(item.md_path, item.output_path) for item in items],
+    )
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Long recordings are split so chunks are recognized concurrently
+TRANSCRIBE_CHUNK_SECONDS = 50
+# Recognition is network-bound, so it gets its own limit instead of the CPU-sized batch one
+TRANSCRIBE_CONCURRENCY = 8
+_transcribe_sem: asyncio.Semaphore = None
+
+def _record_audio_chunks(recognizer, audio_path: str):
+    chunks = []
+    with _sr().AudioFile(audio_path) as source:
+        while True:
+            audio = recognizer.record(source, duration=TRANSCRIBE_CHUNK_SECONDS)
+            if not audio.frame_data:
+                break
+            chunks.append(audio)
+    return chunks
+
+def _recognize_chunk(recognizer, audio) -> str:
+    try:
+        return recognizer.recognize_google(audio)
+    except _sr().UnknownValueError:
+        # Silence or unintelligible speech in one chunk should not fail the whole file
+        return ""
+
+async def _recognize_bounded(recognizer, audio) -> str:
+    async with _transcribe_sem:
+        return await asyncio.to_thread(_recognize_chunk, recognizer, audio)
+
 @app.post("/transcribe_audio")
-def transcribe_audio(audio_path: str):
+async def transcribe_audio(audio_path: str):
     if not is_valid_path(audio_path):
         raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
-    recognizer = sr.Recognizer()
-    with sr.AudioFile(audio_path) as source:
-        audio = recognizer.record(source)
-    transcription = recognizer.recognize_google(audio)
+    if not os.path.isfile(audio_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    # Identical audio content is only ever sent for recognition once
+    audio_hash = await asyncio.to_thread(_hash_file, audio_path)
+    async with pool.connection() as conn:
+        async with conn.execute("SELECT text FROM transcripts WHERE hash = ?", (audio_hash,)) as cursor:
+            row = await cursor.fetchone()
+    if row is not None:
+        return {"status": "success", "transcription": row[0]}
+
+    recognizer = _sr().Recognizer()
+    chunks = await asyncio.to_thread(_record_audio_chunks, recognizer, audio_path)
+    texts = await asyncio.gather(
+        *(_recognize_bounded(recognizer, chunk) for chunk in chunks)
+    )
+    transcription = " ".join(text for text in texts if text)
+    # Nothing recognized anywhere is an error, and is not cached
+    if not transcription:
+        raise HTTPException(status_code=422, detail="Speech could not be recognized")
+    async with pool.connection() as conn:
+        await conn.execute("INSERT OR REPLACE INTO transcripts (hash, text) VALUES (?, ?)", (audio_hash, transcription))
+        await conn.commit()
     return {"status": "success", "transcription": transcription}
 
+# Encoder settings per output format; anything else just gets optimize=True
+IMAGE_SAVE_OPTIONS = {
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True, "compress_level": 6},
+}
+
+def _resize_one(image_path: str, width: int, height: int):
+    Image = _pil_image()
+    with Image.open(image_path) as img:
+        image_format = img.format
+        # Let libjpeg decode at a reduced scale instead of full resolution
+        if image_format == "JPEG":
+            img.draft(img.mode, (width, height))
+        resized_img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+    # Write to a temp file and swap it in so a failed save never truncates the source
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(image_path), suffix=os.path.splitext(image_path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            resized_img.save(f, format=image_format, **IMAGE_SAVE_OPTIONS.get(image_format, {"optimize": True}))
+        shutil.copymode(image_path, tmp_path)
+        os.replace(tmp_path, image_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def check_image_size(width: int, height: int):
+    if width <= 0 or height <= 0:
+        raise HTTPException(status_code=400, detail="Width and height must be positive")
+
 @app.post("/resize_image")
-def resize_image(image_path: str, width: int, height: int):
+async def resize_image(image_path: str, width: int, height: int):
     if not is_valid_path(image_path):
         raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
-    img = Image.open(image_path)
-    resized_img = img.resize((width, height))
-    resized_img.save(image_path)
+    if not os.path.isfile(image_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    check_image_size(width, height)
+    await asyncio.to_thread(_resize_one, image_path, width, height)
     return {"status": "success", "message": "Image resized"}
 
+@app.post("/resize_images")
+async def resize_images(items: list[ResizeItem]):
+    check_batch_size(items)
+    for item in items:
+        if not is_valid_path(item.image_path):
+            raise HTTPException(status_code=400, detail="Access outside data directory is not allowed")
+        if not os.path.isfile(item.image_path):
+            raise HTTPException(status_code=404, detail=f"File not found: {item.image_path}")
+        check_image_size(item.width, item.height)
+    return await run_batch(
+        [item.image_path for item in items],
+        [asyncio.to_thread(_resize_one, item.image_path, item.width, item.height) for item in items],
+    )
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000)
 